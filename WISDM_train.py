@@ -12,6 +12,7 @@ from models.GRAPHSENSOR import GRAPHSENSOR
 from models.WISDM_baseline.MobileNet import MobileNetV3_Small
 from models.WISDM_baseline.ResNet32 import ResNet, BasicBlock
 from models.WISDM_baseline.EfficientNet import EfficientNet
+from utils.util import prepare_runtime
 from sklearn.metrics import f1_score
 
 """
@@ -55,6 +56,9 @@ def get_args():
     parser.add_argument('--data', default="./prepare_datasets/WISDM/phone/accel/")
     parser.add_argument('--workers', type=int, default=0)
     parser.add_argument('--model', type=str, default="GRAPHSENSOR")
+    parser.add_argument('--amp', action='store_true', help="mixed precision (FP16) training, RESNET only, (default: False)")
+    parser.add_argument('--compile', action='store_true', help="torch.compile the model, single device (no DataParallel), (default: False)")
+    parser.add_argument('--benchmark', action='store_true', help="cuDNN autotuning + TF32 instead of deterministic kernels, (default: False)")
     args = parser.parse_args()
 
     return args
@@ -91,7 +95,7 @@ class AverageMeter(object):
         return fmtstr.format(**self.__dict__)
 
 
-def train(train_loader, model, criterion, optimizer, epoch, args):
+def train(train_loader, model, criterion, optimizer, scaler, epoch, args):
     batch_time = AverageMeter('Time', ':6.3f')
     data_time = AverageMeter('Data', ':6.3f')
     losses = AverageMeter('Loss', ':.4e')
@@ -115,8 +119,9 @@ def train(train_loader, model, criterion, optimizer, epoch, args):
         accuracy.update(acc, data.size(0))
         f1_score.update(f1, data.size(0))
 
-        loss.backward()
-        optimizer.step()
+        scaler.scale(loss).backward()
+        scaler.step(optimizer)
+        scaler.update()
 
         # measure elapsed time
         batch_time.update(time.time() - end)
@@ -201,6 +206,8 @@ def main():
     seed_torch()
     root = "./prepare_datasets/WISDM/watch/accel/"
     args = get_args()
+    if args.benchmark:
+        prepare_runtime(benchmark=True, deterministic=False, allow_tf32=True)
     m = Prepare_WISDM()
     training_files, subject_files = m.prepare_data(root)
     train_loader, test_loader = data_generator_np(training_files, subject_files, args.batch_size)
@@ -211,7 +218,7 @@ def main():
     if args.model == "MOBILENET":
         model = MobileNetV3_Small(class_num=args.num_classes)
     elif args.model == "RESNET":
-        model = ResNet(BasicBlock, [3, 4, 6, 3], 1, num_classes=args.num_classes)
+        model = ResNet(BasicBlock, [3, 4, 6, 3], 1, num_classes=args.num_classes, use_amp=args.amp)
     elif args.model == "EFFICIENTNET":
         model = EfficientNet(num_classes=args.num_classes)
     elif args.model == "GRAPHSENSOR":
@@ -224,7 +231,11 @@ def main():
         return sum(p.numel() for p in model.parameters() if p.requires_grad)
 
     print(f'The model has {count_parameters(model):,} trainable parameter')
-    if torch.cuda.device_count() >= 1:
+    if args.compile:
+        # a compiled forward is bound to this instance, nn.DataParallel replicas would all call it
+        model = model.to(device)
+        model.compile(mode="reduce-overhead")
+    elif torch.cuda.device_count() >= 1:
         print("num GPUs: ", torch.cuda.device_count())
         model = nn.DataParallel(model).to(device)
 
@@ -233,11 +244,12 @@ def main():
 
     optimizer = optim.Adam(model.parameters(), lr=args.learning_rate, weight_decay=0.0001, amsgrad=True)
     criterion = nn.CrossEntropyLoss().to(device)
+    scaler = torch.amp.GradScaler("cuda", enabled=args.amp and use_cuda and args.model == "RESNET")
 
     start_time = time.time()
     for epoch in range(args.epochs):
         adjust_learning_rate(optimizer, epoch, args)
-        train(train_loader, model, criterion,  optimizer, epoch, args)
+        train(train_loader, model, criterion,  optimizer, scaler, epoch, args)
         acc, f1 = validate(test_loader, model, criterion,  args)
 
         is_best = acc > best_acc
@@ -1,6 +1,5 @@
 import torch
 import torch.nn as nn
-import torch.nn.functional as F
 from modules.signal_segment_representation import SignalSegmentRepresentation
 from modules.relationship_learning import Block
 
@@ -16,7 +15,7 @@ class GRAPHSENSOR(nn.Module):
     class_num: class number
 
     input size: B, 1, L
-    output size: B, class_num
+    output size: B, class_num (logits, nn.CrossEntropyLoss applies the log_softmax)
 
     """
 
@@ -58,7 +57,7 @@ class GRAPHSENSOR(nn.Module):
         x = self.conv3(x)
         x = self.conv4(x)
         x = x.flatten(1)
-        return F.log_softmax(x, dim=-1)
+        return x
 
 
 
@@ -1,6 +1,9 @@
+import copy
 import torch
 import torch.nn as nn
-import torch.nn.functional as F
+from torch.ao.quantization import get_default_qconfig_mapping, quantize_dynamic
+from torch.ao.quantization.quantize_fx import prepare_fx, convert_fx
+from torch.nn.utils.fusion import fuse_conv_bn_eval
 
 class BasicBlock(nn.Module):
     expansion = 1
@@ -30,18 +33,31 @@ class BasicBlock(nn.Module):
         if self.downsample is not None:
             identity = self.downsample(x)
 
-        out = out + identity
+        out += identity
         out = self.relu(out)
 
         return out
 
+    def eval_fuse(self):
+        "fold every BatchNorm2d into the preceding Conv2d (inference only)"
+        self.eval()
+        self.conv1 = fuse_conv_bn_eval(self.conv1, self.bn1)
+        self.bn1 = nn.Identity()
+        self.conv2 = fuse_conv_bn_eval(self.conv2, self.bn2)
+        self.bn2 = nn.Identity()
+        if self.downsample is not None:
+            self.downsample[0] = fuse_conv_bn_eval(self.downsample[0], self.downsample[1])
+            self.downsample[1] = nn.Identity()
+
 
 
 class ResNet(nn.Module):
 
-    def __init__(self, block, layers, channels=1, num_classes=18):
+    def __init__(self, block, layers, channels=1, num_classes=18, use_amp=False):
         super(ResNet, self).__init__()
 
+        self.use_amp = use_amp
+
         self.in_planes = 64
 
         self.conv1   = nn.Conv2d(channels, self.in_planes, kernel_size=7, stride=2, padding=3, bias=False)
@@ -58,14 +74,18 @@ class ResNet(nn.Module):
 
         self.fc1 = nn.Sequential(
             nn.Linear(200, 32 * 32),
-            nn.GELU()
+            nn.GELU(approximate='tanh'),
+            nn.Unflatten(-1, (32, 32))
         )
 
         self.fc2      = nn.Sequential(
             nn.Linear(512, 256),
-            nn.GELU(),
+            nn.GELU(approximate='tanh'),
             nn.Linear(256, num_classes))
 
+        # NHWC weights let cuDNN / oneDNN pick their native channels-last conv kernels
+        self.to(memory_format=torch.channels_last)
+
 
     def _make_layer(self, block, planes, blocks, stride=1):
         downsample = None
@@ -84,24 +104,81 @@ class ResNet(nn.Module):
             layers.append(block(self.in_planes, planes))
         return nn.Sequential(*layers)
 
+    def eval_fuse(self):
+        "fold every BatchNorm2d of the stem and the BasicBlocks into the preceding Conv2d (inference only)"
+        self.eval()
+        self.conv1 = fuse_conv_bn_eval(self.conv1, self.bn1)
+        self.bn1 = nn.Identity()
+        for layer in (self.layer1, self.layer2, self.layer3, self.layer4):
+            for block in layer:
+                block.eval_fuse()
+        return self
+
+    def quantize_int8(self, calibration_loader, num_batches=32, backend="x86", is_reference=False):
+        "post-training static INT8 quantization (FX) of the conv stack, fc1 / fc2 stay FP32 (returns a copy)"
+        model = self._eager_copy().cpu().eval()
+        qconfig_mapping = get_default_qconfig_mapping(backend) \
+            .set_module_name("fc1", None) \
+            .set_module_name("fc2", None)
+
+        data, _ = next(iter(calibration_loader))
+        prepared = prepare_fx(model, qconfig_mapping, example_inputs=(data.cpu(),))
+        with torch.no_grad():
+            for i, (data, _) in enumerate(calibration_loader):
+                if i == num_batches:
+                    break
+                prepared(data.cpu())
+        return convert_fx(prepared, is_reference=is_reference)
+
+    def to_int8_cpu(self):
+        "dynamic INT8 quantization of the Linear layers for CPU inference (returns a copy)"
+        model = self._eager_copy().cpu().eval()
+        return quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+
+    def export_onnx(self, path, sample_input, calibration_loader=None):
+        "ONNX export (opset 17, dynamic batch); with calibration_loader, INT8 with explicit Q/DQ nodes"
+        if calibration_loader is None:
+            model = self._eager_copy().eval()
+        else:
+            model = self.quantize_int8(calibration_loader, is_reference=True)
+            sample_input = sample_input.cpu()
+        with torch.no_grad():
+            torch.onnx.export(model, sample_input, path,
+                              opset_version=17,
+                              do_constant_folding=True,
+                              input_names=["input"],
+                              output_names=["logits"],
+                              dynamic_axes={"input": {0: "batch"}, "logits": {0: "batch"}})
+
+    def _eager_copy(self):
+        "FP32 copy without autocast and without a compiled forward (nn.Module.compile binds it to self)"
+        model = copy.deepcopy(self)
+        model.use_amp = False
+        model._compiled_call_impl = None
+        return model
+
     def forward(self, x):
-        x = x.unsqueeze(-2)
+        x = x.view(x.size(0), 1, -1)  # (B, 200) or (B, 1, 200) -> (B, 1, 200)
         x = self.fc1(x)
-        x = x.view(x.size()[0], x.size()[1], 32, 32)
-        x = self.conv1(x)
-        x = self.bn1(x)
-        x = self.relu(x)
-        x = self.maxpool(x)
-
-        x = self.layer1(x)
-        x = self.layer2(x)
-        x = self.layer3(x)
-        x = self.layer4(x)
-
-        x = self.avgpool(x)
-        x = torch.flatten(x, 1)
-        x = self.fc2(x)
-
-        return F.log_softmax(x, dim=-1)
+        x = x.contiguous(memory_format=torch.channels_last)
+
+        # FP16 tensor-core convolutions (every conv after the 1-channel stem has 64/128/256/512 channels)
+        with torch.autocast(device_type="cuda", dtype=torch.float16, enabled=self.use_amp and x.is_cuda):
+            x = self.conv1(x)
+            x = self.bn1(x)
+            x = self.relu(x)
+            x = self.maxpool(x)
+
+            x = self.layer1(x)
+            x = self.layer2(x)
+            x = self.layer3(x)
+            x = self.layer4(x)
+
+            x = self.avgpool(x)
+            x = torch.flatten(x, 1)
+
+        x = self.fc2(x.float())
+
+        return x
 
 
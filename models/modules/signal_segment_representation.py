@@ -1,6 +1,6 @@
 import torch
 import torch.nn as nn
-from torch.nn import functional as f
+from torch.nn.utils.fusion import fuse_conv_bn_eval
 
 """
 2.1  Signal Segments Representation
@@ -16,23 +16,30 @@ Signal Segment Representation: class SignalSegmentRepresentation(nn.Module)
 (1) Signal Segment Definition -> (2) Signal Segment Representation -> (3) Global Node Attention
 """
 
+"""
+"same" paddings of the SignalSegment2Vec Encoder kernels.
+The 49-tap / stride-6 first layer is kept as published: it spans ~0.5 s of a 100 Hz EEG epoch and
+changing it alters every downstream feature length and invalidates trained checkpoints.
+"""
+PAD49 = 49 // 2
+PAD7 = 7 // 2
+PAD3 = 3 // 2
+
 
 class SignalSegmentDefinition(nn.Module):
     """
    (1) Signal Segment Definition
 
     input size: B, 1, 1, L
-    output size: B, K, 1, D
+    output size: B, K, D
     """
-    def __init__(self, kernel_size, stride):
+    def __init__(self, segment_size, stride):
         super().__init__()
-        self.kernel_size = kernel_size
+        self.segment_size = segment_size
         self.stride = stride
 
     def forward(self, x):
-        b = f.unfold(x, kernel_size=self.kernel_size, stride=self.stride)  # overlapping sliding window
-        b = b.permute(0, 2, 1)
-        b = b.unsqueeze(-2)
+        b = x.flatten(1).unfold(-1, self.segment_size, self.stride)  # overlapping sliding window (strided view)
         return b
 
 
@@ -46,32 +53,47 @@ class SignalSegmentRepresentation(nn.Module):
     segment_num: number of the signal segments
 
     input size:  B, 1, 1, L
-    output size: B, K, 1, C
+    output size: B, 1, K, C
     """
     def __init__(self, segment_size, overlapping_rate, segment_num):
         super(SignalSegmentRepresentation, self).__init__()
         self.overlapping = int(segment_size - segment_size * overlapping_rate)
-        self.segment = SignalSegmentDefinition((1, segment_size), self.overlapping)
+        self.segment = SignalSegmentDefinition(segment_size, self.overlapping)
         self.segment2vec = SignalSegment2Vec(30)
         self.gna = GNA(segment_num)
 
     def forward(self, x):
-        signal_segments = []
         x = self.segment(x)
-        x = x.squeeze()
-        "share the SignalSegment2Vec Encoder"
-        for idx in range(x.size()[1]):
-            data = x[:, idx, :]
-            data = data.unsqueeze(1)
-            out = self.segment2vec(data)
-            out = out.view(x.size()[0], 1, -1)
-            signal_segments.append(out)
-        signal_segments = torch.cat(signal_segments, dim=1)
-        signal_segments = signal_segments .unsqueeze(2)
+        B, K, D = x.size()
+        "share the SignalSegment2Vec Encoder: fold the K segments into the batch and encode them in one pass"
+        x = x.reshape(B * K, 1, D)  # the only copy: materializes the overlapping windows for the conv
+        signal_segments = self.segment2vec(x)
+        signal_segments = signal_segments.view(B, K, 1, -1)  # the encoder output is already (B*K, ...) contiguous
         "global node attention"
-        signal_segments = self.gna(signal_segments).permute(0, 2, 1, 3)
+        signal_segments = self.gna(signal_segments).view(B, 1, K, -1)  # B, K, 1, C -> B, 1, K, C without a copy
         return signal_segments
 
+    def script_encoder(self, sample_input=None):
+        """
+        Replace the shared SignalSegment2Vec Encoder by its TorchScript version.
+
+        Call it after weight initialization / checkpoint loading (and eval_fuse, if used),
+        those rely on the eager submodules. If sample_input (B, 1, 1, L) is given, two
+        eval-mode warm-up forwards (profiling run + optimized run) pay the optimization
+        cost at load time; BatchNorm statistics and the train / eval mode are preserved.
+        """
+        self.segment2vec = torch.jit.script(self.segment2vec)
+        if sample_input is not None:
+            was_training = self.training
+            self.eval()
+            try:
+                with torch.no_grad():
+                    for _ in range(2):
+                        self(sample_input)
+            finally:
+                self.train(was_training)
+        return self
+
 
 class GNA(nn.Module):
     """
@@ -85,45 +107,47 @@ class GNA(nn.Module):
     """
     def __init__(self, channel, reduction=2):
         super(GNA, self).__init__()
-        self.avg_pool = nn.AdaptiveAvgPool2d(1)
         self.fc = nn.Sequential(
             nn.Conv2d(channel, channel // reduction, 1, bias=False),
-            nn.GELU(),
+            nn.GELU(approximate='tanh'),
             nn.Conv2d(channel // reduction, channel, 1, bias=False),
             nn.Sigmoid()
         )
 
     def forward(self, x):
-        b, c, _, _ = x.size()
-        y = self.avg_pool(x)
+        y = x.mean(dim=(2, 3), keepdim=True)  # global average pooling
         y = self.fc(y)
-        return x * y.expand_as(x)
+        return x * y
 
 
 class SignalSegment2Vec(nn.Module):
     """
     SignalSegment2Vec Encoder module in Signal Segment Representation
 
-    input size:  B, K, 1, D
-    output size: B, K, 1, C
+    input arg:
+    afr_reduced_cnn_size: output channels of the AFR residual block
+
+    the K signal segments are folded into the batch axis
+    input size:  B*K, 1, D
+    output size: B*K, C', D'  (C = C' * D')
     """
     def __init__(self, afr_reduced_cnn_size):
         super(SignalSegment2Vec, self).__init__()
         self.features = nn.Sequential(
-            nn.Conv1d(1, 64, kernel_size=49, stride=6, bias=False, padding=int(49//2)),
+            nn.Conv1d(1, 64, kernel_size=49, stride=6, bias=False, padding=PAD49),
             nn.BatchNorm1d(64),
-            nn.GELU(),
-            nn.MaxPool1d(kernel_size=7, stride=4, padding=int(7//2)),
+            nn.GELU(approximate='tanh'),
+            nn.MaxPool1d(kernel_size=7, stride=4, padding=PAD7),
 
-            nn.Conv1d(64, 128, kernel_size=7, stride=1, bias=False, padding=int(7//2)),
+            nn.Conv1d(64, 128, kernel_size=7, stride=1, bias=False, padding=PAD7),
             nn.BatchNorm1d(128),
-            nn.GELU(),
+            nn.GELU(approximate='tanh'),
 
-            nn.Conv1d(128, 128, kernel_size=7, stride=1, bias=False, padding=int(7//2)),
+            nn.Conv1d(128, 128, kernel_size=7, stride=1, bias=False, padding=PAD7),
             nn.BatchNorm1d(128),
-            nn.GELU(),
+            nn.GELU(approximate='tanh'),
 
-            nn.MaxPool1d(kernel_size=3, stride=4, padding=int(3//2)),
+            nn.MaxPool1d(kernel_size=3, stride=4, padding=PAD3),
         )
 
         self.inplanes = 128
@@ -149,6 +173,22 @@ class SignalSegment2Vec(nn.Module):
         x = self.AFR(x)
         return x
 
+    def eval_fuse(self):
+        "fold every BatchNorm1d of the encoder into the preceding Conv1d (inference only)"
+        self.eval()
+        _fuse_conv_bn_sequential(self.features)
+        for block in self.AFR:
+            block.eval_fuse()
+        return self
+
+
+def _fuse_conv_bn_sequential(seq):
+    "in-place Conv1d + BatchNorm1d folding for adjacent pairs of an nn.Sequential"
+    for idx in range(len(seq) - 1):
+        if isinstance(seq[idx], nn.Conv1d) and isinstance(seq[idx + 1], nn.BatchNorm1d):
+            seq[idx] = fuse_conv_bn_eval(seq[idx], seq[idx + 1])
+            seq[idx + 1] = nn.Identity()
+
 
 """
 "Residual Squeeze-and-Excitation(SE) Block"
@@ -156,21 +196,27 @@ class SignalSegment2Vec(nn.Module):
 
 
 class ResLayer(nn.Module):
+    """
+    input size:  B*K, C, L
+    output size: B*K, C, L
+
+    all segments of the batch go through fc as one (B*K, C) GEMM;
+    keep B*K a multiple of 8 for tensor-core friendly shapes
+    """
     def __init__(self, channel, reduction=2):
         super(ResLayer, self).__init__()
-        self.avg_pool = nn.AdaptiveAvgPool1d(1)
         self.fc = nn.Sequential(
             nn.Linear(channel, channel // reduction, bias=False),
-            nn.GELU(),
+            nn.GELU(approximate='tanh'),
             nn.Linear(channel // reduction, channel, bias=False),
             nn.Sigmoid()
         )
 
     def forward(self, x):
         b, c, _ = x.size()
-        y = self.avg_pool(x).view(b, c)
+        y = x.mean(dim=2)  # global average pooling
         y = self.fc(y).view(b, c, 1)
-        return x * y.expand_as(x)
+        return x * y
 
 
 class ResBasicBlock(nn.Module):
@@ -178,10 +224,11 @@ class ResBasicBlock(nn.Module):
 
     def __init__(self, inplanes, planes, stride=1, downsample=None, reduction=4):
         super(ResBasicBlock, self).__init__()
-        self.conv1 = nn.Conv1d(inplanes, planes, stride)
+        # 1x1 convolutions (the AFR block was trained with kernel_size=1); no bias, BatchNorm follows
+        self.conv1 = nn.Conv1d(inplanes, planes, kernel_size=1, stride=stride, bias=False)
         self.bn1 = nn.BatchNorm1d(planes)
-        self.relu = nn.GELU()
-        self.conv2 = nn.Conv1d(planes, planes, 1)
+        self.relu = nn.GELU(approximate='tanh')
+        self.conv2 = nn.Conv1d(planes, planes, kernel_size=1, bias=False)
         self.bn2 = nn.BatchNorm1d(planes)
         self.reslayer = ResLayer(planes, reduction)
         self.downsample = downsample
@@ -200,3 +247,28 @@ class ResBasicBlock(nn.Module):
         out += residual
         out = self.relu(out)
         return out
+
+    def _load_from_state_dict(self, state_dict, prefix, local_metadata, strict,
+                              missing_keys, unexpected_keys, error_msgs):
+        """
+        checkpoints saved before conv1 / conv2 dropped their bias: the BatchNorm that
+        follows absorbs the bias exactly, BN(conv(x) + b) == BN'(conv(x)) with
+        running_mean' = running_mean - b (in training mode the batch mean cancels it anyway)
+        """
+        for conv, bn in (("conv1", "bn1"), ("conv2", "bn2")):
+            bias_key = prefix + conv + ".bias"
+            mean_key = prefix + bn + ".running_mean"
+            if getattr(self, conv).bias is None and bias_key in state_dict and mean_key in state_dict:
+                state_dict[mean_key] = state_dict[mean_key] - state_dict.pop(bias_key)
+        super(ResBasicBlock, self)._load_from_state_dict(state_dict, prefix, local_metadata, strict,
+                                                         missing_keys, unexpected_keys, error_msgs)
+
+    def eval_fuse(self):
+        "fold every BatchNorm1d into the preceding Conv1d (inference only)"
+        self.eval()
+        self.conv1 = fuse_conv_bn_eval(self.conv1, self.bn1)
+        self.bn1 = nn.Identity()
+        self.conv2 = fuse_conv_bn_eval(self.conv2, self.bn2)
+        self.bn2 = nn.Identity()
+        if self.downsample is not None:
+            _fuse_conv_bn_sequential(self.downsample)
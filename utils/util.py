@@ -7,6 +7,7 @@ import os
 import numpy as np
 from glob import glob
 import math
+import torch
 
 
 def load_folds_data(np_data_path, n_folds):
@@ -79,6 +80,51 @@ def write_json(content, fname):
         json.dump(content, handle, indent=4, sort_keys=False)
 
 
+def prepare_runtime(benchmark=True, deterministic=False, allow_tf32=True):
+    '''
+    cuDNN / matmul backend knobs.
+    benchmark: autotune the conv algorithm per input shape; only pays off when the
+    input shape stays fixed, every new shape triggers another autotuning pass.
+    deterministic: restrict cuDNN to deterministic algorithms (reproducible runs).
+    allow_tf32: TF32 tensor cores for matmuls and convolutions on Ampere and newer GPUs.
+    '''
+    torch.backends.cudnn.benchmark = benchmark
+    torch.backends.cudnn.deterministic = deterministic
+    torch.backends.cuda.matmul.allow_tf32 = allow_tf32
+    torch.backends.cudnn.allow_tf32 = allow_tf32
+
+
+def cuda_graph_forward(model, sample_input, warmup=3):
+    '''
+    capture the inference forward pass of model for the fixed shape of sample_input
+    into a CUDA graph. model must be a plain (not DataParallel) CUDA module and
+    sample_input a CUDA tensor. Returns run(x), which copies x into the captured
+    input buffer and replays the graph; the returned output tensor is reused by
+    every replay, clone it if it has to outlive the next call.
+    '''
+    model.eval()
+    static_input = sample_input.clone()
+
+    "warm up on a side stream so lazy initialization is not captured"
+    stream = torch.cuda.Stream()
+    stream.wait_stream(torch.cuda.current_stream())
+    with torch.no_grad(), torch.cuda.stream(stream):
+        for _ in range(warmup):
+            model(static_input)
+    torch.cuda.current_stream().wait_stream(stream)
+
+    graph = torch.cuda.CUDAGraph()
+    with torch.no_grad(), torch.cuda.graph(graph):
+        static_output = model(static_input)
+
+    def run(x):
+        static_input.copy_(x)
+        graph.replay()
+        return static_output
+
+    return run
+
+
 def inf_loop(data_loader):
     ''' wrapper function for endless data loader. '''
     for loader in repeat(data_loader):